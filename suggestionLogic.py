@@ -1,5 +1,6 @@
 # Home-PA Scheduling Algorithm
 # Core scheduling logic for suggestion allocation
+# Requires Python 3.10+ (dataclass slots=True, int.bit_count)
 
 from __future__ import annotations
 
@@ -7,15 +8,26 @@ import itertools
 import math
 import random
 from collections import defaultdict
+from concurrent.futures import Executor
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Sequence, Tuple
+from enum import IntEnum
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
 
 Coordinate = Tuple[float, float]
 MINUTES_PER_DISTANCE_UNIT = 3.0  # minutes per unit of euclidean distance
 MANDATORY_NEED_THRESHOLD = 1.0    # suggestions with need >= this are mandatory
+MANDATORY_NEED_TOLERANCE = 1e-6   # float slack when comparing need against the threshold
 HOME_LABEL = "home"
 HOME_COORDINATE: Coordinate = (0.0, 0.0)  # Default home location; can be updated
 
+# Maps a 0/1 byte mask onto ASCII digits so it can be parsed as a binary int
+_MASK_TO_BINARY_DIGITS = bytes.maketrans(b"\x00\x01", b"01")
+BRUTE_FORCE_MAX_SUGGESTIONS = 5  # batches this small check every order; cheaper than setting up the DP
+HELD_KARP_MAX_SUGGESTIONS = 12  # larger batches use branch-and-bound instead of the 2^n DP table
+EXACT_ORDER_MAX_SUGGESTIONS = 16  # larger batches are ordered by 2-opt local search unless exact is requested
+RANDOM_SUGGESTION_CHUNK = 1024  # iter_random_suggestions draws its random columns this many at a time
+
 
 def set_home_location(coordinate: Coordinate) -> None:
     """
@@ -57,6 +69,11 @@ def travel_minutes_between(a: Coordinate, b: Coordinate) -> Tuple[float, float]:
     return distance, minutes
 
 
+def _travel_minutes(ax: float, ay: float, bx: float, by: float) -> float:
+    """Travel minutes between (ax, ay) and (bx, by); scalar form of travel_minutes_between."""
+    return math.hypot(ax - bx, ay - by) * MINUTES_PER_DISTANCE_UNIT
+
+
 def normalize_location_preference(value: Optional[str]) -> Optional[str]:
     if value is None:
         return None
@@ -68,7 +85,21 @@ def normalize_location_preference(value: Optional[str]) -> Optional[str]:
     return normalized
 
 
-@dataclass(frozen=True)
+class LocationPreference(IntEnum):
+    NONE = 0
+    NEAR_HOME = 1
+    OTHER = 2  # any other named place; not supported by the allocator
+
+
+def location_preference_kind(normalized: Optional[str]) -> LocationPreference:
+    if normalized is None:
+        return LocationPreference.NONE
+    if normalized == "near_home":
+        return LocationPreference.NEAR_HOME
+    return LocationPreference.OTHER
+
+
+@dataclass(frozen=True, slots=True)
 class Gap:
     gap_id: str
     duration: float  # minutes
@@ -82,7 +113,7 @@ class Gap:
             raise ValueError(f"Gap '{self.gap_id}' duration must be positive.")
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Suggestion:
     suggestion_id: str
     need: float
@@ -94,6 +125,8 @@ class Suggestion:
     score: float = field(init=False)
     min_duration: float = field(init=False)
     max_duration: float = field(init=False)
+    location_preference_kind: LocationPreference = field(init=False)
+    is_mandatory: bool = field(init=False)
 
     def __post_init__(self) -> None:
         if self.duration <= 0:
@@ -103,10 +136,13 @@ class Suggestion:
         object.__setattr__(self, "score", clamp01(self.need) + clamp01(self.importance))
         object.__setattr__(self, "min_duration", self.duration)
         object.__setattr__(self, "max_duration", self.duration)
-        object.__setattr__(self, "location_preference", normalize_location_preference(self.location_preference))
+        preference = normalize_location_preference(self.location_preference)
+        object.__setattr__(self, "location_preference", preference)
+        object.__setattr__(self, "location_preference_kind", location_preference_kind(preference))
+        object.__setattr__(self, "is_mandatory", self.need >= MANDATORY_NEED_THRESHOLD - MANDATORY_NEED_TOLERANCE)
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduledBlock:
     suggestion_id: str
     gap_id: str
@@ -115,7 +151,7 @@ class ScheduledBlock:
     location: Coordinate
 
 
-@dataclass
+@dataclass(slots=True)
 class MovementLogEntry:
     from_label: str
     to_label: str
@@ -125,11 +161,12 @@ class MovementLogEntry:
 
 @dataclass
 class AllocationState:
-    gap_usage: Dict[str, float]
+    gap_usage: List[float]  # minutes used per gap, indexed by gap position
     gap_index: int
     current_cursor: Optional[Coordinate]
     current_label: Optional[str]
     gap_has_blocks: bool
+    total_remaining: float  # unused minutes across gaps from gap_index onward
 
 
 @dataclass
@@ -167,6 +204,298 @@ def resolve_gap_labels(gaps: Sequence[Gap]) -> Dict[str, Tuple[str, str]]:
     return labels
 
 
+def _knapsack_kernel(weights: Sequence[int], values: Sequence[float], W: int) -> Tuple[List[float], List[int]]:
+    """
+    0/1 knapsack over integer weights with capacity W.
+
+    Returns (dp, take): dp[w] is the best value within capacity w, and take[i]
+    packs one bit per capacity (bit w set when item i improves dp[w]).
+    """
+    dp = [0.0] * (W + 1)
+    take = [0] * len(weights)
+
+    for i, (w_i, v_i) in enumerate(zip(weights, values)):
+        if w_i > W:
+            continue
+        improved = bytearray(W + 1)
+        # iterate backwards to avoid reuse
+        for w in range(W, w_i - 1, -1):
+            candidate = dp[w - w_i] + v_i
+            if candidate > dp[w]:
+                dp[w] = candidate
+                improved[w] = 1
+        take[i] = int(improved.translate(_MASK_TO_BINARY_DIGITS)[::-1], 2)
+    return dp, take
+
+
+def _travel_matrix(points: Sequence[Optional[Coordinate]]) -> List[List[float]]:
+    """
+    Pairwise travel minutes between points.
+
+    A None point is a virtual node with zero travel to and from everything,
+    so a missing start/end location contributes nothing to a tour.
+    """
+    size = len(points)
+    matrix = [[0.0] * size for _ in range(size)]
+    for i in range(size):
+        a = points[i]
+        if a is None:
+            continue
+        ax, ay = a
+        row = matrix[i]
+        for j in range(i + 1, size):
+            b = points[j]
+            if b is None:
+                continue
+            minutes = _travel_minutes(ax, ay, b[0], b[1])
+            row[j] = minutes
+            matrix[j][i] = minutes
+    return matrix
+
+
+def _perm_cost(D: Sequence[Sequence[float]], start_idx: int, end_idx: int, perm: Sequence[int]) -> float:
+    """Travel minutes of start_idx -> perm... -> end_idx using the precomputed matrix D."""
+    previous = perm[0]
+    total = D[start_idx][previous]
+    for idx in perm[1:]:
+        total += D[previous][idx]
+        previous = idx
+    return total + D[previous][end_idx]
+
+
+def _brute_force_order(D: Sequence[Sequence[float]], n: int, start_idx: int, end_idx: int) -> Tuple[List[int], float, int]:
+    """
+    Cheapest start_idx -> (all nodes 0..n-1) -> end_idx path by costing all n! orders.
+    Only for tiny n, where it beats Held-Karp's table setup. Returns (order, cost_minutes, orders_checked).
+    """
+    D_start = D[start_idx]
+    to_end = [D[v][end_idx] for v in range(n)]
+    best_order: Sequence[int] = ()
+    best_cost = math.inf
+    checked = 0
+    for perm in itertools.permutations(range(n)):
+        previous = perm[0]
+        total = D_start[previous]
+        for idx in perm[1:]:
+            total += D[previous][idx]
+            previous = idx
+        total += to_end[previous]
+        checked += 1
+        if total < best_cost:
+            best_order, best_cost = perm, total
+    return list(best_order), best_cost, checked
+
+
+def _held_karp(D: Sequence[Sequence[float]], n: int, start_idx: int, end_idx: int) -> Tuple[List[int], float, int]:
+    """
+    Shortest start_idx -> (all nodes 0..n-1) -> end_idx path via Held-Karp bitmask DP.
+
+    cost[mask][j] is the cheapest path from start visiting exactly the nodes in
+    mask and ending at j. When start and end are interchangeable (e.g. both
+    home), the best path is instead joined from two half-size paths that both
+    leave start, one of them reversed, so subsets larger than half are never
+    expanded. Returns (order, cost_minutes, transitions), where transitions
+    counts the DP relaxations performed.
+    """
+    full = (1 << n) - 1
+    symmetric = n >= 2 and D[start_idx][:n] == D[end_idx][:n]
+    max_size = n - n // 2 if symmetric else n
+    cost = [[math.inf] * n for _ in range(full + 1)]
+    parent = [[-1] * n for _ in range(full + 1)]
+    start_row = D[start_idx]
+    for j in range(n):
+        cost[1 << j][j] = start_row[j]
+
+    transitions = 0
+    for mask in range(1, full):
+        visited = [i for i in range(n) if mask >> i & 1]
+        if len(visited) >= max_size:
+            continue
+        row = cost[mask]
+        unvisited = [j for j in range(n) if not mask >> j & 1]
+        transitions += len(visited) * len(unvisited)
+        for i in visited:
+            base = row[i]
+            D_i = D[i]
+            for j in unvisited:
+                candidate = base + D_i[j]
+                next_mask = mask | (1 << j)
+                if candidate < cost[next_mask][j]:
+                    cost[next_mask][j] = candidate
+                    parent[next_mask][j] = i
+
+    def trace(mask: int, node: int) -> List[int]:
+        path: List[int] = []
+        while node != -1:
+            path.append(node)
+            mask, node = mask & ~(1 << node), parent[mask][node]
+        path.reverse()
+        return path
+
+    if not symmetric:
+        best_last = -1
+        best_cost = math.inf
+        for j in range(n):
+            candidate = cost[full][j] + D[j][end_idx]
+            if candidate < best_cost:
+                best_cost = candidate
+                best_last = j
+        transitions += n
+        return trace(full, best_last), best_cost, transitions
+
+    # start -> (mask, ending at j) -> m -> (rest, traversed backwards) -> end
+    half = n // 2
+    best_cost = math.inf
+    best_join = (0, -1, -1)
+    for mask in range(1, full):
+        if mask.bit_count() != half:
+            continue
+        rest = full ^ mask
+        rest_row = cost[rest]
+        in_mask = [j for j in range(n) if mask >> j & 1]
+        in_rest = [m for m in range(n) if rest >> m & 1]
+        transitions += len(in_mask) * len(in_rest)
+        for j in in_mask:
+            base = cost[mask][j]
+            D_j = D[j]
+            for m in in_rest:
+                candidate = base + D_j[m] + rest_row[m]
+                if candidate < best_cost:
+                    best_cost = candidate
+                    best_join = (mask, j, m)
+    mask, j, m = best_join
+    order = trace(mask, j) + trace(full ^ mask, m)[::-1]
+    return order, best_cost, transitions
+
+
+def _mst_cost(D: Sequence[Sequence[float]], nodes: List[int]) -> float:
+    """Weight of a minimum spanning tree over nodes (Prim's algorithm, O(k^2))."""
+    if len(nodes) <= 1:
+        return 0.0
+    first, rest = nodes[0], nodes[1:]
+    D_first = D[first]
+    link = [D_first[v] for v in rest]
+    total = 0.0
+    while rest:
+        k = min(range(len(rest)), key=link.__getitem__)
+        total += link[k]
+        u = rest.pop(k)
+        link.pop(k)
+        D_u = D[u]
+        for idx, v in enumerate(rest):
+            if D_u[v] < link[idx]:
+                link[idx] = D_u[v]
+    return total
+
+
+def _nearest_neighbour_path(D: Sequence[Sequence[float]], n: int, start_idx: int, end_idx: int) -> Tuple[List[int], float]:
+    """Greedy start_idx -> (all nodes 0..n-1) -> end_idx path, always hopping to the nearest unvisited node."""
+    order: List[int] = []
+    cost = 0.0
+    last = start_idx
+    unvisited = list(range(n))
+    while unvisited:
+        nearest = min(unvisited, key=D[last].__getitem__)
+        cost += D[last][nearest]
+        order.append(nearest)
+        unvisited.remove(nearest)
+        last = nearest
+    cost += D[last][end_idx]
+    return order, cost
+
+
+def _two_opt_path(
+    D: Sequence[Sequence[float]], n: int, start_idx: int, end_idx: int, tolerance: float
+) -> Tuple[List[int], float, int]:
+    """
+    Heuristic start_idx -> (all nodes 0..n-1) -> end_idx path: the nearest-neighbour
+    path improved by 2-opt segment reversals until none shortens it by more than
+    tolerance minutes. O(n^2) per pass; relies on D being symmetric.
+    Returns (order, cost_minutes, moves_evaluated).
+    """
+    order, _ = _nearest_neighbour_path(D, n, start_idx, end_idx)
+    path = [start_idx, *order, end_idx]
+    evaluated = 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n):
+            for j in range(i + 1, n + 1):
+                a, b, c, d = path[i - 1], path[i], path[j], path[j + 1]
+                evaluated += 1
+                # Reversing path[i..j] swaps edges a-b and c-d for a-c and b-d
+                if D[a][c] + D[b][d] < D[a][b] + D[c][d] - tolerance:
+                    path[i:j + 1] = path[j:i - 1:-1]
+                    improved = True
+    order = path[1:-1]
+    return order, _perm_cost(D, start_idx, end_idx, order), evaluated
+
+
+def _bb_tsp(
+    D: Sequence[Sequence[float]],
+    n: int,
+    start_idx: int,
+    end_idx: int,
+    first: Optional[int] = None,
+) -> Tuple[List[int], float, int]:
+    """
+    Shortest start_idx -> (all nodes 0..n-1) -> end_idx path via depth-first branch-and-bound.
+
+    The incumbent starts as the nearest-neighbour tour. Children are tried
+    cheapest hop first, and a partial path is pruned when its cost alone, or its
+    cost plus a lower bound on any completion, cannot beat it. The bound is the
+    MST weight over the current and unvisited nodes plus the cheapest final hop
+    to the end node; leaving the end out of the MST keeps the bound useful when
+    the end is a zero-cost virtual node. If first is given, only paths starting
+    with that node are searched (the incumbent may still be returned).
+    Returns (order, cost_minutes, nodes_expanded).
+    """
+    best_order, best_cost = _nearest_neighbour_path(D, n, start_idx, end_idx)
+
+    path: List[int] = []
+    expanded = 0
+
+    def extend(last: int, remaining: List[int], cost_so_far: float) -> None:
+        nonlocal best_order, best_cost, expanded
+        expanded += 1
+        if not remaining:
+            total = cost_so_far + D[last][end_idx]
+            if total < best_cost:
+                best_cost = total
+                best_order = list(path)
+            return
+        D_end = D[end_idx]
+        bound = _mst_cost(D, [last, *remaining]) + min(D_end[v] for v in remaining)
+        if cost_so_far + bound >= best_cost:
+            return
+        D_last = D[last]
+        # Cheapest hop first tightens the incumbent early; once one hop alone
+        # reaches the incumbent, every later (costlier) hop does too.
+        for nxt in sorted(remaining, key=D_last.__getitem__):
+            step_cost = cost_so_far + D_last[nxt]
+            if step_cost >= best_cost:
+                break
+            path.append(nxt)
+            extend(nxt, [v for v in remaining if v != nxt], step_cost)
+            path.pop()
+
+    if first is None:
+        extend(start_idx, list(range(n)), 0.0)
+    else:
+        path.append(first)
+        extend(first, [v for v in range(n) if v != first], D[start_idx][first])
+    return best_order, best_cost, expanded
+
+
+def _bb_tsp_parallel(
+    D: Sequence[Sequence[float]], n: int, start_idx: int, end_idx: int, executor: Executor
+) -> Tuple[List[int], float, int]:
+    """Run _bb_tsp once per first node on executor's workers and keep the cheapest path."""
+    results = list(executor.map(partial(_bb_tsp, D, n, start_idx, end_idx), range(n)))
+    order, best_cost, _ = min(results, key=lambda result: result[1])
+    return order, best_cost, sum(expanded for _, _, expanded in results)
+
+
 def greedy_select_candidates(
     suggestions: Sequence[Suggestion],
     gaps: Sequence[Gap],
@@ -195,29 +524,27 @@ def greedy_select_candidates(
     # Convert capacity and item durations to integer DP units
     W = max(0, int(round(capacity / resolution_minutes)))
     weights = [max(1, int(round(s.min_duration / resolution_minutes))) for s in items]
-    values = [s.score for s in items]
-
-    # DP: 1D table with backtracking info
-    dp = [0.0] * (W + 1)
-    take = [[False] * (W + 1) for _ in range(n)]
-
-    for i in range(n):
-        w_i = weights[i]
-        v_i = values[i]
-        # iterate backwards to avoid reuse
-        for w in range(W, w_i - 1, -1):
-            candidate = dp[w - w_i] + v_i
-            if candidate > dp[w]:
-                dp[w] = candidate
-                take[i][w] = True
 
-    # backtrack to find chosen items
-    w = W
     chosen: List[Suggestion] = []
-    for i in range(n - 1, -1, -1):
-        if take[i][w]:
-            chosen.append(items[i])
-            w -= weights[i]
+    if sum(weights) <= W:
+        # Everything fits, so the DP would take exactly the items that add score
+        chosen = [s for s in reversed(items) if s.score > 0]
+    else:
+        # Weights that share a factor (e.g. quarter-hour durations) only reach
+        # capacities that are multiples of it, so shrink the table by that factor
+        unit = math.gcd(*weights)
+        if unit > 1:
+            weights = [w_i // unit for w_i in weights]
+            W //= unit
+        values = [s.score for s in items]
+        _, take = _knapsack_kernel(weights, values, W)
+
+        # backtrack to find chosen items
+        w = W
+        for i in range(n - 1, -1, -1):
+            if take[i] >> w & 1:
+                chosen.append(items[i])
+                w -= weights[i]
     chosen.sort(key=lambda s: s.score, reverse=True)
     return chosen
 
@@ -228,13 +555,37 @@ def enumerate_best_order(
     end_location: Optional[Coordinate],
     *,
     permutation_limit: int,
+    tolerance: float = 1e-6,
+    travel_matrix: Optional[List[List[float]]] = None,
+    exact: bool = False,
+    executor: Optional[Executor] = None,
 ) -> Tuple[List[Suggestion], float, int]:
     """
     Find the best ordering of suggestions that minimizes travel cost in minutes.
     
+    Batches of up to BRUTE_FORCE_MAX_SUGGESTIONS check every order directly;
+    larger ones use Held-Karp dynamic programming over the precomputed travel
+    matrix, O(n^2 * 2^n) instead of enumerating all n! orders; batches larger
+    than HELD_KARP_MAX_SUGGESTIONS fall back to branch-and-bound search. Beyond
+    EXACT_ORDER_MAX_SUGGESTIONS the order comes from 2-opt local search instead,
+    which is fast but not guaranteed optimal. One or two suggestions, or
+    suggestions that all share a location (pairwise travel within tolerance),
+    are resolved directly without a search.
+
+    Args:
+        tolerance: Minutes below which travel counts as zero and 2-opt gains are ignored
+        travel_matrix: Precomputed _travel_matrix of the suggestion locations followed
+            by start_location and end_location, used instead of recomputing travel times
+        exact: Use the exact search at any size instead of 2-opt for large batches
+        executor: Split the branch-and-bound search by first move across this
+            executor's workers. The caller owns it (a process pool needs the usual
+            __main__ guard); the split searches expand more nodes in total, so
+            permutations_checked is higher and it only pays off with idle CPUs
+
     Returns:
         (best_order, travel_cost_minutes, permutations_checked)
         - travel_cost_minutes: total travel time in minutes
+        - permutations_checked: number of DP transitions, search nodes or 2-opt moves evaluated
     """
     n = len(suggestions)
     if n == 0:
@@ -244,42 +595,56 @@ def enumerate_best_order(
             f"Permutation search limited to {permutation_limit} suggestions, received {n}."
         )
 
-    best_order: Optional[Tuple[Suggestion, ...]] = None
-    best_cost_minutes = math.inf
-    permutations_checked = 0
-
-    for permutation in itertools.permutations(suggestions):
-        permutations_checked += 1
-        travel_cost_minutes = 0.0
-        previous = start_location
-        for suggestion in permutation:
-            if previous is not None:
-                _, minutes = travel_minutes_between(previous, suggestion.location)
-                travel_cost_minutes += minutes
-            previous = suggestion.location
-        if previous is not None and end_location is not None:
-            _, minutes = travel_minutes_between(previous, end_location)
-            travel_cost_minutes += minutes
-        if travel_cost_minutes < best_cost_minutes:
-            best_cost_minutes = travel_cost_minutes
-            best_order = permutation
-
-    assert best_order is not None
-    return list(best_order), best_cost_minutes, permutations_checked
+    # Nodes 0..n-1 are suggestions; n and n + 1 are the start and end locations
+    start_idx, end_idx = n, n + 1
+    if travel_matrix is None:
+        D = _travel_matrix([s.location for s in suggestions] + [start_location, end_location])
+    else:
+        D = travel_matrix
+    if n == 1:
+        return list(suggestions), _perm_cost(D, start_idx, end_idx, (0,)), 1
+    if n == 2:
+        forward = _perm_cost(D, start_idx, end_idx, (0, 1))
+        backward = _perm_cost(D, start_idx, end_idx, (1, 0))
+        if backward < forward:
+            return [suggestions[1], suggestions[0]], backward, 2
+        return list(suggestions), forward, 2
+    if all(D[i][j] <= tolerance for i in range(n) for j in range(i + 1, n)):
+        # Every order costs the same; keep the given one
+        return list(suggestions), _perm_cost(D, start_idx, end_idx, range(n)), 1
+
+    # Suggestions sharing a location are interchangeable for routing: travel
+    # between them is zero, so some optimal tour visits each such group in one
+    # run. Search over one node per distinct location and expand the groups
+    # in input order.
+    groups: Dict[Tuple[float, ...], List[int]] = defaultdict(list)
+    for idx, suggestion in enumerate(suggestions):
+        # tuple() so list coordinates (e.g. decoded JSON) can key the groups
+        groups[tuple(suggestion.location)].append(idx)
+    members = list(groups.values())
+    m = len(members)
+    if m < n:
+        nodes = [group[0] for group in members] + [start_idx, end_idx]
+        D = [[D[i][j] for j in nodes] for i in nodes]
+        start_idx, end_idx = m, m + 1
+
+    if m <= BRUTE_FORCE_MAX_SUGGESTIONS:
+        order, best_cost_minutes, permutations_checked = _brute_force_order(D, m, start_idx, end_idx)
+    elif m <= HELD_KARP_MAX_SUGGESTIONS:
+        order, best_cost_minutes, permutations_checked = _held_karp(D, m, start_idx, end_idx)
+    elif m > EXACT_ORDER_MAX_SUGGESTIONS and not exact:
+        order, best_cost_minutes, permutations_checked = _two_opt_path(D, m, start_idx, end_idx, tolerance)
+    elif executor is not None:
+        order, best_cost_minutes, permutations_checked = _bb_tsp_parallel(D, m, start_idx, end_idx, executor)
+    else:
+        order, best_cost_minutes, permutations_checked = _bb_tsp(D, m, start_idx, end_idx)
+    return [suggestions[idx] for node in order for idx in members[node]], best_cost_minutes, permutations_checked
 
 
 def remaining_capacity(gaps: Sequence[Gap], state: Optional[AllocationState], tolerance: float) -> float:
     if state is None:
         return total_gap_minutes(gaps)
-    total = 0.0
-    for idx, gap in enumerate(gaps):
-        if idx < state.gap_index:
-            continue
-        used = state.gap_usage.get(gap.gap_id, 0.0)
-        remaining = max(0.0, gap.duration - used)
-        if remaining > tolerance:
-            total += remaining
-    return total
+    return state.total_remaining if state.total_remaining > tolerance else 0.0
 
 
 def starting_location_for_state(gaps: Sequence[Gap], state: Optional[AllocationState]) -> Optional[Coordinate]:
@@ -294,6 +659,115 @@ def starting_location_for_state(gaps: Sequence[Gap], state: Optional[AllocationS
     return gaps[state.gap_index].start_location
 
 
+def _assign_single_gap(
+    ordered_suggestions: Sequence[Suggestion],
+    gap: Gap,
+    gap_labels: Dict[str, Tuple[str, str]],
+    *,
+    tolerance: float,
+    initial_state: Optional[AllocationState],
+) -> Optional[Tuple[List[ScheduledBlock], AllocationState, List[MovementLogEntry]]]:
+    """
+    assign_order_to_gaps for exactly one gap. With nowhere to shift to, every
+    case that would move to the next gap is a failure, so the cursor state is
+    kept in locals and no gap transitions are tracked.
+    """
+    if initial_state is None:
+        used = 0.0
+        cursor: Optional[Coordinate] = None
+        current_label: Optional[str] = None
+        total_remaining = gap.duration
+    else:
+        if initial_state.gap_index >= 1:
+            return None
+        used = initial_state.gap_usage[0]
+        cursor = initial_state.current_cursor
+        current_label = initial_state.current_label
+        total_remaining = initial_state.total_remaining
+
+    start_label, end_label = gap_labels.get(gap.gap_id, (f"{gap.gap_id}:start", f"{gap.gap_id}:end"))
+    boundary_start, boundary_end = gap_labels.get(gap.gap_id, ("", ""))
+    home_start = boundary_start == HOME_LABEL
+    home_end = boundary_end == HOME_LABEL
+    gap_duration = gap.duration
+    end = gap.end_location
+
+    schedule: List[ScheduledBlock] = []
+    movement_logs: List[MovementLogEntry] = []
+    last_idx = len(ordered_suggestions) - 1
+
+    for idx, suggestion in enumerate(ordered_suggestions):
+        duration = suggestion.duration
+        location = suggestion.location
+        here = cursor if cursor is not None else gap.start_location
+        label = current_label if current_label is not None else start_label
+        remaining = gap_duration - used
+        if remaining <= tolerance:
+            return None
+
+        preference = suggestion.location_preference_kind
+        if preference != LocationPreference.NONE:
+            # Only "near_home" location preference is supported
+            if preference != LocationPreference.NEAR_HOME:
+                return None
+            # Non-mandatory "near_home" must sit at a home boundary of the gap;
+            # for mandatory ones it is only a preference
+            if not suggestion.is_mandatory:
+                travel_in = _travel_minutes(here[0], here[1], location[0], location[1])
+                can_place = False
+                if cursor is None and home_start:
+                    can_place = travel_in + duration <= remaining + tolerance
+                if not can_place and home_end:
+                    total_required = travel_in + duration
+                    if idx == last_idx:
+                        total_required += _travel_minutes(location[0], location[1], end[0], end[1])
+                    can_place = total_required <= remaining + tolerance
+                if not can_place:
+                    return None
+
+        distance, travel_in = travel_minutes_between(here, location)
+        if travel_in + duration > remaining + tolerance:
+            return None
+
+        if travel_in > tolerance:
+            used += travel_in
+            total_remaining -= travel_in
+            movement_logs.append(MovementLogEntry(label, suggestion.suggestion_id, distance, travel_in))
+            remaining -= travel_in
+
+        if duration > remaining + tolerance:
+            return None
+
+        schedule.append(
+            ScheduledBlock(
+                suggestion_id=suggestion.suggestion_id,
+                gap_id=gap.gap_id,
+                start_offset=used,
+                duration=duration,
+                location=location,
+            )
+        )
+        used += duration
+        total_remaining -= duration
+        cursor = location
+        current_label = suggestion.suggestion_id
+
+    # Close the gap: travel from the last block to the gap end must fit
+    here = cursor if cursor is not None else gap.start_location
+    distance, minutes = travel_minutes_between(here, end)
+    if minutes > gap_duration - used + tolerance:
+        return None
+    if minutes > tolerance:
+        used += minutes
+        total_remaining -= minutes
+        from_label = current_label if current_label is not None else start_label
+        movement_logs.append(MovementLogEntry(from_label, end_label, distance, minutes))
+    total_remaining -= gap_duration - used
+
+    state = AllocationState([used], 1, None, None, False, total_remaining)
+    return schedule, state, movement_logs
+
+
 def assign_order_to_gaps(
     ordered_suggestions: Sequence[Suggestion],
     gaps: Sequence[Gap],
@@ -303,21 +777,45 @@ def assign_order_to_gaps(
     initial_state: Optional[AllocationState] = None,
 ) -> Optional[Tuple[List[ScheduledBlock], AllocationState, List[MovementLogEntry]]]:
     if not ordered_suggestions:
-        state = initial_state or AllocationState({gap.gap_id: 0.0 for gap in gaps}, 0, None, None, False)
+        state = initial_state or AllocationState(
+            [0.0] * len(gaps), 0, None, None, False, total_gap_minutes(gaps)
+        )
         return [], state, []
+    if len(gaps) == 1:
+        return _assign_single_gap(
+            ordered_suggestions, gaps[0], gap_labels, tolerance=tolerance, initial_state=initial_state
+        )
+    return _assign_gaps(
+        ordered_suggestions, gaps, gap_labels, tolerance=tolerance, initial_state=initial_state
+    )
+
 
-    gap_usage = {gap.gap_id: 0.0 for gap in gaps}
+def _assign_gaps(
+    ordered_suggestions: Sequence[Suggestion],
+    gaps: Sequence[Gap],
+    gap_labels: Dict[str, Tuple[str, str]],
+    *,
+    tolerance: float,
+    initial_state: Optional[AllocationState],
+) -> Optional[Tuple[List[ScheduledBlock], AllocationState, List[MovementLogEntry]]]:
+    """General assign_order_to_gaps for any number of gaps and a non-empty order."""
     gap_index = 0
     current_cursor: Optional[Coordinate] = None
     current_label: Optional[str] = None
     gap_has_blocks = False
+    # Kept in step with every gap_usage increase and every gap that is closed
+    total_remaining = total_gap_minutes(gaps)
 
-    if initial_state is not None:
-        gap_usage.update(initial_state.gap_usage)
+    if initial_state is None:
+        gap_usage = [0.0] * len(gaps)
+    else:
+        # Copied so a failed assignment leaves the caller's state untouched
+        gap_usage = list(initial_state.gap_usage)
         gap_index = initial_state.gap_index
         current_cursor = initial_state.current_cursor
         current_label = initial_state.current_label
         gap_has_blocks = initial_state.gap_has_blocks
+        total_remaining = initial_state.total_remaining
 
     def current_gap() -> Optional[Gap]:
         if gap_index >= len(gaps):
@@ -337,14 +835,14 @@ def assign_order_to_gaps(
 
     def ensure_gap_exit_ok(gap: Gap, cursor: Coordinate, label: Optional[str]) -> Optional[Tuple[float, float, str, str]]:
         distance, minutes = travel_minutes_between(cursor, gap.end_location)
-        remaining = gap.duration - gap_usage[gap.gap_id]
+        remaining = gap.duration - gap_usage[gap_index]
         if minutes > remaining + tolerance:
             return None
         from_label = label if label is not None else gap_start_label(gap)
         return distance, minutes, from_label, gap_end_label(gap)
 
     def shift_to_next_gap() -> bool:
-        nonlocal gap_index, current_cursor, current_label, gap_has_blocks
+        nonlocal gap_index, current_cursor, current_label, gap_has_blocks, total_remaining
         gap = current_gap()
         if gap is None:
             return False
@@ -354,8 +852,11 @@ def assign_order_to_gaps(
             return False
         distance, minutes, from_label, to_label = exit_info
         if minutes > tolerance:
-            gap_usage[gap.gap_id] += minutes
+            gap_usage[gap_index] += minutes
+            total_remaining -= minutes
             movement_logs.append(MovementLogEntry(from_label, to_label, distance, minutes))
+        # Whatever is left in the gap being closed is no longer available
+        total_remaining -= gap.duration - gap_usage[gap_index]
         gap_index += 1
         current_cursor = None
         current_label = None
@@ -363,7 +864,7 @@ def assign_order_to_gaps(
         return gap_index < len(gaps)
 
     def allocate_suggestion(suggestion: Suggestion, is_last_suggestion: bool = False) -> bool:
-        nonlocal gap_index, current_cursor, current_label, gap_has_blocks
+        nonlocal gap_index, current_cursor, current_label, gap_has_blocks, total_remaining
         duration = suggestion.duration
         while True:
             gap = current_gap()
@@ -373,24 +874,23 @@ def assign_order_to_gaps(
             cursor = current_cursor if current_cursor is not None else gap.start_location
             label = current_label if current_label is not None else gap_start_label(gap)
 
-            used = gap_usage[gap.gap_id]
+            used = gap_usage[gap_index]
             remaining = gap.duration - used
             if remaining <= tolerance:
                 if not shift_to_next_gap():
                     return False
                 continue
 
-            preference = suggestion.location_preference
-            if preference:
+            preference = suggestion.location_preference_kind
+            if preference != LocationPreference.NONE:
                 # Only "near_home" location preference is supported
-                if preference != "near_home":
+                if preference != LocationPreference.NEAR_HOME:
                     # Reject suggestions with other location preferences
                     if not shift_to_next_gap():
                         return False
                     continue
                 
-                # Check if suggestion is mandatory
-                is_mandatory = suggestion.need >= MANDATORY_NEED_THRESHOLD - tolerance
+                is_mandatory = suggestion.is_mandatory
                 
                 start_label, end_label = gap_labels.get(gap.gap_id, ("", ""))
                 is_at_first_gap_start = (gap_index == 0 and current_cursor is None and start_label == HOME_LABEL)
@@ -399,10 +899,12 @@ def assign_order_to_gaps(
                 # For non-mandatory suggestions with "near_home", it's a HARD CONSTRAINT
                 # They must be placed at home boundaries (start of first gap or end of last gap)
                 if not is_mandatory:
+                    location = suggestion.location
+                    travel_in = _travel_minutes(cursor[0], cursor[1], location[0], location[1])
+
                     # Check if we can place at first gap start
                     can_place_at_first = False
                     if is_at_first_gap_start:
-                        distance, travel_in = travel_minutes_between(cursor, suggestion.location)
                         total_required = travel_in + duration
                         can_place_at_first = (total_required <= remaining + tolerance)
                     
@@ -410,10 +912,10 @@ def assign_order_to_gaps(
                     # Only need return travel if this is the last suggestion in the order
                     can_place_at_last = False
                     if is_at_last_gap:
-                        distance, travel_in = travel_minutes_between(cursor, suggestion.location)
                         if is_last_suggestion:
                             # Last suggestion needs return travel to gap end
-                            distance_to_end, travel_to_end = travel_minutes_between(suggestion.location, gap.end_location)
+                            end = gap.end_location
+                            travel_to_end = _travel_minutes(location[0], location[1], end[0], end[1])
                             total_required = travel_in + duration + travel_to_end
                         else:
                             # Not last - will travel to next suggestion (don't know location yet, so check without return)
@@ -434,8 +936,9 @@ def assign_order_to_gaps(
                     
                     # For last gap, if placing here, need to account for travel back to gap end
                     if is_at_last_gap and prefer_this_placement:
-                        distance, travel_in = travel_minutes_between(cursor, suggestion.location)
-                        distance_to_end, travel_to_end = travel_minutes_between(suggestion.location, gap.end_location)
+                        location, end = suggestion.location, gap.end_location
+                        travel_in = _travel_minutes(cursor[0], cursor[1], location[0], location[1])
+                        travel_to_end = _travel_minutes(location[0], location[1], end[0], end[1])
                         total_with_return = travel_in + duration + travel_to_end
                         if total_with_return > remaining + tolerance:
                             # Can't fit with return travel, but still allow placement if it fits without return
@@ -452,7 +955,8 @@ def assign_order_to_gaps(
                 continue
 
             if travel_in > tolerance:
-                gap_usage[gap.gap_id] += travel_in
+                gap_usage[gap_index] += travel_in
+                total_remaining -= travel_in
                 movement_logs.append(MovementLogEntry(label, suggestion.suggestion_id, distance, travel_in))
                 used += travel_in
                 remaining -= travel_in
@@ -462,8 +966,9 @@ def assign_order_to_gaps(
                     return False
                 continue
 
-            start_offset = gap_usage[gap.gap_id]
-            gap_usage[gap.gap_id] += duration
+            start_offset = gap_usage[gap_index]
+            gap_usage[gap_index] += duration
+            total_remaining -= duration
             
             schedule.append(
                 ScheduledBlock(
@@ -493,14 +998,16 @@ def assign_order_to_gaps(
             return None
         distance, minutes, from_label, to_label = exit_info
         if minutes > tolerance:
-            gap_usage[gap.gap_id] += minutes
+            gap_usage[gap_index] += minutes
+            total_remaining -= minutes
             movement_logs.append(MovementLogEntry(from_label, to_label, distance, minutes))
+        total_remaining -= gap.duration - gap_usage[gap_index]
         gap_index += 1
         current_cursor = None
         current_label = None
         gap_has_blocks = False
 
-    state = AllocationState(gap_usage, gap_index, current_cursor, current_label, gap_has_blocks)
+    state = AllocationState(gap_usage, gap_index, current_cursor, current_label, gap_has_blocks, total_remaining)
     return schedule, state, movement_logs
 
 
@@ -512,6 +1019,8 @@ def schedule_suggestions(
     permutation_limit: int = 8,
     tolerance: float = 1e-6,
     resolution_minutes: float = 1.0,
+    exact_order: bool = False,
+    executor: Optional[Executor] = None,
 ) -> ScheduleResult:
     gap_list = list(gaps)
     suggestion_list = list(suggestions)
@@ -530,13 +1039,27 @@ def schedule_suggestions(
         )
 
     # Partition mandatory vs optional
-    mandatory = [s for s in suggestion_list if s.need >= MANDATORY_NEED_THRESHOLD - tolerance]
-    optional = [s for s in suggestion_list if s not in mandatory]
+    mandatory: List[Suggestion] = []
+    optional: List[Suggestion] = []
+    total_mand_duration = 0.0
+    longest_mand_duration = 0.0
+    for s in suggestion_list:
+        if s.is_mandatory:
+            mandatory.append(s)
+            total_mand_duration += s.duration
+            if s.duration > longest_mand_duration:
+                longest_mand_duration = s.duration
+        else:
+            optional.append(s)
 
-    # Feasibility check: mandatory tasks must fit
+    # Feasibility check: mandatory tasks must fit, in total and each within a
+    # single gap (blocks never span gaps)
     total_gap_time = total_gap_minutes(gap_list)
-    total_mand_duration = sum(s.duration for s in mandatory)
-    if total_mand_duration > total_gap_time + tolerance:
+    longest_gap = max(gap.duration for gap in gap_list)
+    if (
+        total_mand_duration > total_gap_time + tolerance
+        or longest_mand_duration > longest_gap + tolerance
+    ):
         # Infeasible: mandatory tasks cannot fit
         return ScheduleResult(
             ordered_suggestions=[],
@@ -549,8 +1072,11 @@ def schedule_suggestions(
             movement_log=[],
         )
 
-    # Prepare remaining list: schedule mandatory first
+    # Prepare remaining list: schedule mandatory first. Membership is tracked by
+    # object identity in remaining_ids, since suggestion_id is not guaranteed to
+    # be unique; the list itself is only compacted at the end.
     remaining = list(mandatory) + list(optional)
+    remaining_ids: Set[int] = {id(s) for s in remaining}
 
     state: Optional[AllocationState] = None
     ordered_total: List[Suggestion] = []
@@ -561,40 +1087,56 @@ def schedule_suggestions(
     total_travel_cost = 0.0
     permutations_total = 0
 
+    def drop(candidate: Suggestion) -> None:
+        remaining_ids.discard(id(candidate))
+        dropped_total.append(candidate)
+
     def schedule_group(group: List[Suggestion]) -> bool:
         nonlocal state, total_travel_cost, permutations_total
-        batch = [s for s in group if s in remaining]
-        if not batch:
+        candidates = [s for s in group if id(s) in remaining_ids]
+        if not candidates:
             return False
-        batch.sort(key=lambda s: s.score, reverse=True)
-        while len(batch) > permutation_limit:
-            dropped_candidate = batch.pop()
-            if dropped_candidate in remaining:
-                remaining.remove(dropped_candidate)
-            dropped_total.append(dropped_candidate)
+        # Keep the permutation_limit best by score (stable, so ties keep input
+        # order); drop the rest lowest score first
+        limit = max(permutation_limit, 0)
+        ranked = sorted(candidates, key=lambda s: s.score, reverse=True)
+        batch = ranked[:limit]
+        for dropped_candidate in reversed(ranked[limit:]):
+            drop(dropped_candidate)
         if not batch:
             return False
 
+        # state only changes on success, so every attempt below starts from the
+        # same place and removes suggestions from the end of working: compute
+        # travel for the whole batch once and slice it per attempt
+        start_location = starting_location_for_state(gap_list, state)
+        if start_location is None:
+            return False
+        end_location = gap_list[-1].end_location
+        batch_travel = _travel_matrix([s.location for s in batch] + [start_location, end_location])
+        batch_size = len(batch)
+
         success = False
         working = list(batch)
         while working:
-            start_location = starting_location_for_state(gap_list, state)
-            end_location = gap_list[-1].end_location if gap_list else None
-            if start_location is None:
-                working.clear()
-                break
+            size = len(working)
+            if size == batch_size:
+                travel = batch_travel
+            else:
+                travel = [row[:size] + row[batch_size:] for row in batch_travel[:size] + batch_travel[batch_size:]]
             try:
                 order, travel_cost, permutations_checked = enumerate_best_order(
                     working,
                     start_location=start_location,
                     end_location=end_location,
                     permutation_limit=permutation_limit,
+                    tolerance=tolerance,
+                    travel_matrix=travel,
+                    exact=exact_order,
+                    executor=executor,
                 )
             except ValueError:
-                dropped_candidate = working.pop()
-                if dropped_candidate in remaining:
-                    remaining.remove(dropped_candidate)
-                dropped_total.append(dropped_candidate)
+                drop(working.pop())
                 continue
 
             result = assign_order_to_gaps(
@@ -605,16 +1147,12 @@ def schedule_suggestions(
                 initial_state=state,
             )
             if result is None:
-                dropped_candidate = working.pop()
-                if dropped_candidate in remaining:
-                    remaining.remove(dropped_candidate)
-                dropped_total.append(dropped_candidate)
+                drop(working.pop())
                 continue
 
             schedule, state, movements = result
             for suggestion in order:
-                if suggestion in remaining:
-                    remaining.remove(suggestion)
+                remaining_ids.discard(id(suggestion))
             ordered_total.extend(order)
             scheduled_blocks_total.extend(schedule)
             for block in schedule:
@@ -628,7 +1166,7 @@ def schedule_suggestions(
         return success
 
     # Schedule mandatory suggestions first
-    mandatory_remaining = [s for s in mandatory if s in remaining]
+    mandatory_remaining = [s for s in mandatory if id(s) in remaining_ids]
     if mandatory_remaining:
         if not schedule_group(mandatory_remaining):
             # Mandatory scheduling failed (likely due to location/travel constraints)
@@ -645,13 +1183,13 @@ def schedule_suggestions(
             )
 
     # Now process optional suggestions using knapsack DP
-    while remaining:
+    while remaining_ids:
         capacity = remaining_capacity(gap_list, state, tolerance)
         if capacity <= tolerance:
             break
 
         # Only select from optional suggestions
-        optional_remaining = [s for s in optional if s in remaining]
+        optional_remaining = [s for s in optional if id(s) in remaining_ids]
         if not optional_remaining:
             break
 
@@ -666,20 +1204,21 @@ def schedule_suggestions(
         if not selected:
             break
 
-        selected.sort(key=lambda s: s.score, reverse=True)
-
-        location_selected = [s for s in selected if s.location_preference and s in remaining]
-        location_scheduled = False
-        if location_selected:
-            location_scheduled = schedule_group(location_selected)
-            if location_scheduled:
-                continue
+        # selected is already sorted by descending score and drawn from remaining_ids;
+        # split it in one pass (schedule_group below never touches the flexible half)
+        location_selected: List[Suggestion] = []
+        flexible_selected: List[Suggestion] = []
+        for s in selected:
+            if s.location_preference_kind:
+                location_selected.append(s)
+            else:
+                flexible_selected.append(s)
+
+        if location_selected and schedule_group(location_selected):
+            continue
 
-        flexible_selected = [s for s in selected if not s.location_preference and s in remaining]
         if not flexible_selected:
-            if not location_selected or not location_scheduled:
-                break
-            continue
+            break
 
         if not schedule_group(flexible_selected):
             break
@@ -687,11 +1226,11 @@ def schedule_suggestions(
     scheduled_blocks_total.sort(key=lambda block: (block.gap_id, block.start_offset))
 
     if state is None:
-        unused_time = total_gap_minutes(gap_list)
+        unused_time = total_gap_time
     else:
         unused_time = remaining_capacity(gap_list, state, tolerance)
 
-    dropped = dropped_total + [s for s in remaining if s not in dropped_total]
+    dropped = dropped_total + [s for s in remaining if id(s) in remaining_ids]
 
     return ScheduleResult(
         ordered_suggestions=ordered_total,
@@ -746,6 +1285,113 @@ def format_schedule(result: ScheduleResult) -> str:
     return "\n".join(lines)
 
 
+def _sample_near_home(
+    rng: random.Random, count: int, center: Coordinate, radius: float, grid_size: float
+) -> List[Coordinate]:
+    """Draw count points uniformly within radius of center, clamped to the [0, grid_size] grid."""
+    # Rejection sampling from the bounding square: uniform over the disk (a
+    # uniform angle and radius crowds points toward the center) and no trig.
+    # About 21% of candidate pairs are rejected.
+    rand = rng.random
+    cx, cy = center
+    diameter = 2.0 * radius
+    radius_sq = radius * radius
+    points: List[Coordinate] = []
+    for _ in range(count):
+        while True:
+            # Same values as rng.uniform(-radius, radius) without the method call
+            dx = diameter * rand() - radius
+            dy = diameter * rand() - radius
+            if dx * dx + dy * dy <= radius_sq:
+                break
+        # Clamp with plain comparisons; cheaper than nested min/max calls
+        x = cx + dx
+        x = 0.0 if x < 0.0 else grid_size if x > grid_size else x
+        y = cy + dy
+        y = 0.0 if y < 0.0 else grid_size if y > grid_size else y
+        points.append((x, y))
+    return points
+
+
+def iter_random_suggestions(
+    count: int,
+    *,
+    grid_size: float = 10.0,
+    min_duration: float = 15.0,
+    max_duration: float = 120.0,
+    mandatory_probability: float = 0.1,
+    location_preference_probability: float = 0.3,
+    seed: Optional[int] = None,
+) -> Iterator[Suggestion]:
+    """
+    Lazily generate random suggestions for testing; see generate_random_suggestions.
+
+    Fields are drawn column by column for up to RANDOM_SUGGESTION_CHUNK
+    suggestions at a time, so memory stays bounded however large count is.
+    """
+    # A private generator keeps seeded runs reproducible without touching the
+    # global random module state
+    rng = random.Random(seed)
+
+    activity_names = [
+        "exercise", "meal_prep", "call_mom", "deep_work", "groceries", "meditation",
+        "language_practice", "cleaning", "read_book", "cooking", "shopping", "meeting",
+        "workout", "study", "relax", "errands", "social", "hobby", "maintenance", "planning"
+    ]
+
+    # uniform(a, b) is a + (b - a) * random(), so the spans are computed once
+    # and random() is called directly
+    rand = rng.random
+    mandatory_need_span = 1.0 - MANDATORY_NEED_THRESHOLD
+    duration_span = max_duration - min_duration
+    # Near-home suggestions are placed within home_radius of HOME_COORDINATE;
+    # the rest are uniform over the grid
+    home_radius = 2.0
+    # Next free suffix per activity name: repeats become name_1, name_2, ...
+    # without re-probing every earlier suffix
+    next_suffix: Dict[str, int] = {}
+
+    for chunk_start in range(0, count, RANDOM_SUGGESTION_CHUNK):
+        size = min(RANDOM_SUGGESTION_CHUNK, count - chunk_start)
+        # Draw each column for the whole chunk up front rather than
+        # interleaving scalar draws per suggestion
+        base_names = rng.choices(activity_names, k=size)
+        # Bernoulli masks first: mandatory (need >= MANDATORY_NEED_THRESHOLD) and
+        # location preference. Only "near_home" location preference is supported.
+        mandatory_flags = [rand() < mandatory_probability for _ in range(size)]
+        near_home_flags = [rand() < location_preference_probability for _ in range(size)]
+        needs = [
+            MANDATORY_NEED_THRESHOLD + mandatory_need_span * rand() if mandatory else 0.99 * rand()
+            for mandatory in mandatory_flags
+        ]
+        importances = [rand() for _ in range(size)]
+        durations = [min_duration + duration_span * rand() for _ in range(size)]
+        near_home_points = iter(
+            _sample_near_home(rng, sum(near_home_flags), HOME_COORDINATE, home_radius, grid_size)
+        )
+        locations: List[Coordinate] = [
+            next(near_home_points) if near_home else (grid_size * rand(), grid_size * rand())
+            for near_home in near_home_flags
+        ]
+
+        for base_name, need, importance, duration, location, near_home in zip(
+            base_names, needs, importances, durations, locations, near_home_flags
+        ):
+            # Generate unique suggestion ID
+            counter = next_suffix.get(base_name, 0)
+            next_suffix[base_name] = counter + 1
+            suggestion_id = f"{base_name}_{counter}" if counter else base_name
+
+            yield Suggestion(
+                suggestion_id=suggestion_id,
+                need=need,
+                importance=importance,
+                duration=duration,
+                location=location,
+                location_preference="near_home" if near_home else None,
+            )
+
+
 def generate_random_suggestions(
     count: int,
     *,
@@ -771,76 +1417,17 @@ def generate_random_suggestions(
     Returns:
         List of randomly generated Suggestion objects
     """
-    if seed is not None:
-        random.seed(seed)
-    
-    activity_names = [
-        "exercise", "meal_prep", "call_mom", "deep_work", "groceries", "meditation",
-        "language_practice", "cleaning", "read_book", "cooking", "shopping", "meeting",
-        "workout", "study", "relax", "errands", "social", "hobby", "maintenance", "planning"
-    ]
-    
-    suggestions = []
-    used_names = set()
-    
-    for i in range(count):
-        # Generate unique suggestion ID
-        base_name = random.choice(activity_names)
-        suggestion_id = base_name
-        counter = 1
-        while suggestion_id in used_names:
-            suggestion_id = f"{base_name}_{counter}"
-            counter += 1
-        used_names.add(suggestion_id)
-        
-        # Generate need (with chance of being mandatory)
-        if random.random() < mandatory_probability:
-            need = random.uniform(MANDATORY_NEED_THRESHOLD, 1.0)
-        else:
-            need = random.uniform(0.0, 0.99)
-        
-        # Generate importance
-        importance = random.uniform(0.0, 1.0)
-        
-        # Generate duration
-        duration = random.uniform(min_duration, max_duration)
-        
-        # Generate location preference: only "near_home" is supported
-        location_preference = None
-        if random.random() < location_preference_probability:
-            location_preference = "near_home"
-        
-        # Generate location: if "near_home", place near HOME_COORDINATE; otherwise random
-        if location_preference == "near_home":
-            # Place within ~2 units of home (adjustable)
-            home_radius = 2.0
-            angle = random.uniform(0, 2 * math.pi)
-            distance = random.uniform(0, home_radius)
-            location = (
-                HOME_COORDINATE[0] + distance * math.cos(angle),
-                HOME_COORDINATE[1] + distance * math.sin(angle)
-            )
-            # Clamp to grid bounds
-            location = (
-                max(0.0, min(grid_size, location[0])),
-                max(0.0, min(grid_size, location[1]))
-            )
-        else:
-            # Random point on grid
-            location = (random.uniform(0.0, grid_size), random.uniform(0.0, grid_size))
-        
-        suggestions.append(
-            Suggestion(
-                suggestion_id=suggestion_id,
-                need=need,
-                importance=importance,
-                duration=duration,
-                location=location,
-                location_preference=location_preference,
-            )
+    return list(
+        iter_random_suggestions(
+            count,
+            grid_size=grid_size,
+            min_duration=min_duration,
+            max_duration=max_duration,
+            mandatory_probability=mandatory_probability,
+            location_preference_probability=location_preference_probability,
+            seed=seed,
         )
-    
-    return suggestions
+    )
 
 
 
@@ -851,7 +1438,7 @@ def generate_random_suggestions(
 # ============================================================================
 
 if __name__ == "__main__":
-    sample_suggestions = [
+    sample_suggestions = (
         Suggestion(
             suggestion_id="exercise",
             need=0.85,
@@ -920,9 +1507,9 @@ if __name__ == "__main__":
             duration=25,
             location=(6.6, 6.5),
         ),
-    ]
+    )
 
-    sample_gaps = [
+    sample_gaps = (
         Gap(
             gap_id="gap_1",
             duration=180,
@@ -947,7 +1534,7 @@ if __name__ == "__main__":
             start_label="midtown",
             end_label="home",
         ),
-    ]
+    )
 
     result = schedule_suggestions(
         sample_suggestions,
@@ -957,29 +1544,33 @@ if __name__ == "__main__":
     )
     print(format_schedule(result))
 
-    print("\nOrdered evaluation scores:")
+    # Collect the report and write it with a single print
+    lines = ["", "Ordered evaluation scores:"]
     for suggestion in result.ordered_suggestions:
         allocated = result.allocated_minutes.get(suggestion.suggestion_id, 0.0)
-        print(
+        lines.append(
             f"- {suggestion.suggestion_id}: score {suggestion.score:.2f}, "
             f"allocated {allocated:.0f}/{suggestion.duration:.0f} min"
         )
 
-    print("\nDropped suggestions with scores:")
+    lines.append("")
+    lines.append("Dropped suggestions with scores:")
     for suggestion in result.dropped_suggestions:
-        print(f"- {suggestion.suggestion_id}: score {suggestion.score:.2f}")
+        lines.append(f"- {suggestion.suggestion_id}: score {suggestion.score:.2f}")
 
-    print("\nMovement log:")
+    lines.append("")
+    lines.append("Movement log:")
     for entry in result.movement_log:
-        print(
+        lines.append(
             f"- {entry.from_label} -> {entry.to_label}: {entry.distance:.2f} units ({entry.minutes:.1f} min)"
         )
+    print("\n".join(lines))
 
 
 
     # Unit tests for mandatory behavior and travel units
 
-    def test_mandatory_inclusion_simple():
+    def test_mandatory_inclusion_simple() -> None:
         """Test that mandatory suggestions (need >= 1.0) are always included."""
         # single gap 180 minutes
         gap = Gap("g1", duration=180, start_location=(0, 0), end_location=(0, 0))
@@ -995,7 +1586,7 @@ if __name__ == "__main__":
         print("✓ test_mandatory_inclusion_simple passed")
 
 
-    def test_travel_minutes_units():
+    def test_travel_minutes_units() -> None:
         """Test that travel_cost is reported in minutes, not grid units."""
         gap = Gap("g1", duration=1000, start_location=(0, 0), end_location=(0, 0))
         # two suggestions spatially separated
@@ -1011,7 +1602,7 @@ if __name__ == "__main__":
         print("✓ test_travel_minutes_units passed")
 
 
-    def test_mandatory_infeasible():
+    def test_mandatory_infeasible() -> None:
         """Test that infeasible mandatory suggestions return empty schedule."""
         gap = Gap("g1", duration=100, start_location=(0, 0), end_location=(0, 0))
         # Mandatory task requires 150 minutes, but gap only has 100
@@ -1023,11 +1614,140 @@ if __name__ == "__main__":
         print("✓ test_mandatory_infeasible passed")
 
 
+    def test_mandatory_longer_than_every_gap() -> None:
+        """Test that a mandatory task no single gap can hold makes the schedule infeasible."""
+        # 180 minutes in total, but no gap is longer than 60
+        gaps = [
+            Gap(f"g{i}", duration=60, start_location=(0, 0), end_location=(0, 0))
+            for i in range(1, 4)
+        ]
+        # The long task scores lowest, so retrying without it would fit the rest
+        mandatory = [
+            Suggestion(f"m{i}", need=1.0, importance=importance, duration=duration, location=(0, 0))
+            for i, (duration, importance) in enumerate([(84, 0.1), (49, 0.9), (30, 0.8), (15, 0.7)])
+        ]
+        result = schedule_suggestions(mandatory, gaps, permutation_limit=4)
+        # Nothing is scheduled rather than silently dropping the 84-minute task
+        assert not result.scheduled_blocks
+        assert len(result.dropped_suggestions) == len(mandatory)
+        print("✓ test_mandatory_longer_than_every_gap passed")
+
+
+    def test_duplicate_ids_are_accounted_for() -> None:
+        """Test that suggestions sharing an id are each either scheduled or dropped."""
+        gap = Gap("g1", duration=120, start_location=(0, 0), end_location=(0, 0))
+        suggestions = [
+            Suggestion("dup", need=0.5, importance=importance, duration=30, location=(float(i), 1.0))
+            for i, importance in enumerate([0.9, 0.2, 0.7, 0.4, 0.8])
+        ]
+        # permutation_limit 2 forces the top-k cut between suggestions with the same id
+        result = schedule_suggestions(suggestions, [gap], permutation_limit=2)
+        accounted = [id(s) for s in result.ordered_suggestions] + [id(s) for s in result.dropped_suggestions]
+        assert sorted(accounted) == sorted(id(s) for s in suggestions)
+        print("✓ test_duplicate_ids_are_accounted_for passed")
+
+
+    def test_single_gap_matches_general_path() -> None:
+        """Test that the one-gap fast path allocates exactly like the general path."""
+        rng = random.Random(7)
+
+        def point() -> Coordinate:
+            # Snap some points to a small grid so co-located cases come up
+            if rng.random() < 0.3:
+                return (float(rng.randint(0, 3)), float(rng.randint(0, 3)))
+            return (rng.uniform(0, 10), rng.uniform(0, 10))
+
+        for case in range(300):
+            gaps = [
+                Gap(
+                    "g1",
+                    duration=rng.choice([60, 120, 240, rng.uniform(20, 300)]),
+                    start_location=point(),
+                    end_location=point(),
+                    start_label=rng.choice([None, "home", "studio"]),
+                    end_label=rng.choice([None, "home", "midtown"]),
+                )
+            ]
+            labels = resolve_gap_labels(gaps)
+            pool = [
+                Suggestion(
+                    f"s{i}",
+                    need=rng.choice([1.0, rng.random()]),
+                    importance=rng.random(),
+                    duration=rng.choice([15, 30, 45, rng.uniform(5, 90)]),
+                    location=point(),
+                    location_preference=rng.choice([None, None, None, "near_home", "midtown"]),
+                )
+                for i in range(6)
+            ]
+            # Chain a few orders from the previous state, sometimes leaving the gap open
+            state: Optional[AllocationState] = None
+            for _ in range(3):
+                order = rng.sample(pool, rng.randint(1, 4))
+                fast = _assign_single_gap(order, gaps[0], labels, tolerance=1e-6, initial_state=state)
+                general = _assign_gaps(order, gaps, labels, tolerance=1e-6, initial_state=state)
+                assert fast == general, f"case {case}: {fast} != {general}"
+                if fast is None:
+                    break
+                state = fast[1]
+                if rng.random() < 0.5:
+                    last = order[-1]
+                    state = AllocationState(
+                        list(state.gap_usage), 0, last.location, last.suggestion_id, True, state.total_remaining
+                    )
+        print("✓ test_single_gap_matches_general_path passed")
+
+
+    def test_order_search_matches_brute_force() -> None:
+        """Test every order-search kernel against exhaustive itertools.permutations."""
+        rng = random.Random(11)
+
+        def point() -> Coordinate:
+            # A 3x3 grid makes repeated (co-located) points common
+            if co_located:
+                return (float(rng.randint(0, 2)), float(rng.randint(0, 2)))
+            return (rng.uniform(0, 10), rng.uniform(0, 10))
+
+        for case in range(300):
+            n = rng.randint(1, 7)
+            co_located = rng.random() < 0.4
+            locations = [point() for _ in range(n)]
+            start = rng.choice([None, point()])
+            # start == end exercises Held-Karp's symmetric half join
+            end = rng.choice([None, start, point()])
+            D = _travel_matrix(locations + [start, end])
+            expected = min(_perm_cost(D, n, n + 1, perm) for perm in itertools.permutations(range(n)))
+
+            for name, (order, cost, _) in (
+                ("brute_force", _brute_force_order(D, n, n, n + 1)),
+                ("held_karp", _held_karp(D, n, n, n + 1)),
+                ("bb_tsp", _bb_tsp(D, n, n, n + 1)),
+            ):
+                assert sorted(order) == list(range(n)), f"case {case} {name}: {order}"
+                assert abs(cost - _perm_cost(D, n, n + 1, order)) <= 1e-9, f"case {case} {name}"
+                assert abs(cost - expected) <= 1e-9, f"case {case} {name}: {cost} != {expected}"
+
+            # 2-opt is a heuristic: a valid path, honestly costed, never below the optimum
+            order, cost, _ = _two_opt_path(D, n, n, n + 1, 1e-6)
+            assert sorted(order) == list(range(n)) and cost >= expected - 1e-9
+            assert abs(cost - _perm_cost(D, n, n + 1, order)) <= 1e-9
+
+            suggestions = [Suggestion(f"s{i}", 0.5, 0.5, 10, location) for i, location in enumerate(locations)]
+            ordered, cost, _ = enumerate_best_order(suggestions, start, end, permutation_limit=8)
+            assert sorted(s.suggestion_id for s in ordered) == sorted(s.suggestion_id for s in suggestions)
+            assert abs(cost - expected) <= 1e-9, f"case {case} enumerate_best_order: {cost} != {expected}"
+        print("✓ test_order_search_matches_brute_force passed")
+
+
     # Run tests
     print("Running tests...")
     test_mandatory_inclusion_simple()
     test_travel_minutes_units()
     test_mandatory_infeasible()
+    test_mandatory_longer_than_every_gap()
+    test_duplicate_ids_are_accounted_for()
+    test_single_gap_matches_general_path()
+    test_order_search_matches_brute_force()
     print("\nAll tests passed!")
 
 
@@ -1045,12 +1765,13 @@ if __name__ == "__main__":
         seed=42,  # Set to None for different results each time, or a number for reproducibility
     )
 
-    print(f"Generated {len(random_suggestions)} random suggestions:\n")
+    lines = [f"Generated {len(random_suggestions)} random suggestions:", ""]
     for s in random_suggestions:
-        mandatory = " (MANDATORY)" if s.need >= MANDATORY_NEED_THRESHOLD else ""
+        mandatory = " (MANDATORY)" if s.is_mandatory else ""
         loc_pref = f" [prefers: {s.location_preference}]" if s.location_preference else ""
-        print(f"- {s.suggestion_id}: need={s.need:.2f}, importance={s.importance:.2f}, "
-              f"duration={s.duration:.0f}min, location={s.location}{mandatory}{loc_pref}")
+        lines.append(f"- {s.suggestion_id}: need={s.need:.2f}, importance={s.importance:.2f}, "
+                     f"duration={s.duration:.0f}min, location={s.location}{mandatory}{loc_pref}")
+    print("\n".join(lines))
 
     # You can now use random_suggestions with schedule_suggestions()
     # Example: